@@ -1,13 +1,22 @@
 import bpy
 import laspy
+import os
+import threading
 import numpy as np
 from os import path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from mathutils import Vector
 from bpy.types import Operator
 from bpy_extras.io_utils import ImportHelper
 from bpy.props import StringProperty, BoolProperty, CollectionProperty
 import time
 
+# numexpr is optional: when available it fuses the coordinate scale and offset in a single pass
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
 # List of additional LiDAR attributes to import.
 # This is based on attributes found in french LIDAR-HD files 
 ATTRIBUTE_LIST = [
@@ -24,7 +33,274 @@ ATTRIBUTE_LIST = [
     'point_source_id',
     'gps_time_type',
 ]
-  
+
+# Blender attribute type used for each LiDAR attribute. INT8 is only used for fields
+# whose LAS range fits in a signed byte; anything else falls back to INT.
+ATTRIBUTE_TYPES = {
+    'intensity': 'INT',
+    'return': 'INT8',
+    'number_of_return': 'INT8',
+    'classification': 'INT',
+    'classification_flags': 'INT',
+    'scanner_channel': 'INT8',
+    'scan_direction': 'INT8',
+    'flight_line_edge': 'INT8',
+    'user_data': 'INT',
+    'angle': 'FLOAT',
+    'point_source_id': 'INT',
+    'gps_time_type': 'FLOAT',
+}
+
+# NumPy dtype matching the native storage of each Blender attribute type
+BLENDER_DTYPES = {
+    'INT': np.int32,
+    'INT8': np.int8,
+    'FLOAT': np.float32,
+}
+
+# Print import progress and timings to the console
+DEBUG = False
+
+# Number of points decoded at once when streaming a file
+CHUNK_SIZE = 1_000_000
+
+
+def _raw_bounds(header):
+    '''
+    Returns the bounds of a LAS header in raw integer coordinates, as int64
+    (raw_mins, raw_maxs) arrays, or None if the bounds cannot be trusted: unset
+    (not finite), inverted, or outside the int32 range of raw coordinates.
+
+    :param header: LazPy header object
+    '''
+    mins, maxs = header.mins, header.maxs
+    if not (np.all(np.isfinite(mins)) and np.all(np.isfinite(maxs)) and np.all(mins <= maxs)):
+        return None
+    raw_mins = np.floor((mins - header.offsets) / header.scales)
+    raw_maxs = np.ceil((maxs - header.offsets) / header.scales)
+    info = np.iinfo(np.int32)
+    if np.any(raw_mins < info.min) or np.any(raw_maxs > info.max):
+        return None
+    return raw_mins.astype(np.int64), raw_maxs.astype(np.int64)
+
+
+def _raw_center(raw_bounds):
+    '''
+    Returns the center of raw bounds from _raw_bounds, as int64 raw coordinates.
+
+    :param raw_bounds: (raw_mins, raw_maxs) tuple
+    '''
+    raw_mins, raw_maxs = raw_bounds
+    return (raw_mins + raw_maxs) // 2
+
+
+def _raw_biases(raw_bounds, raws):
+    '''
+    Returns the int64 values subtracted from the raw coordinates of a file before scaling.
+
+    This is the center of the header bounds when they contain the first chunk of points.
+    Some writers leave the bounds unset or wrong, so otherwise the midpoint of that chunk
+    is used instead.
+
+    :param raw_bounds: header bounds from _raw_bounds, or None
+    :param raws: raw X, Y and Z coordinates of the first chunk of points
+    '''
+    chunk_mins = np.array([raw.min() for raw in raws], dtype=np.int64)
+    chunk_maxs = np.array([raw.max() for raw in raws], dtype=np.int64)
+    if raw_bounds is not None and np.all(raw_bounds[0] <= chunk_mins) and np.all(chunk_maxs <= raw_bounds[1]):
+        return _raw_center(raw_bounds)
+    return _raw_center((chunk_mins, chunk_maxs))
+
+
+def _scale_into(raw, bias, scale, out):
+    '''
+    Writes (raw - bias) * scale into a float32 array without allocating a temporary.
+
+    The subtraction is done on the raw integers, so the float32 result stays precise
+    and no float64 pass over the data is needed. It is done in int64 so it cannot wrap.
+
+    :param raw: raw int32 coordinates
+    :param bias: np.int64 value subtracted from raw before scaling
+    :param scale: coordinate scale from the LAS header, as float32
+    :param out: float32 destination array, same length as raw
+    '''
+    if numexpr is not None:
+        numexpr.evaluate('(raw - bias) * scale', out=out, casting='same_kind',
+                         local_dict={'raw': raw, 'bias': bias, 'scale': scale})
+    else:
+        np.subtract(raw, bias, out=out, casting='same_kind')
+        np.multiply(out, scale, out=out)
+
+
+def _iter_point_chunks(infile, filepath):
+    '''
+    Yields the point records of an opened LAS/LAZ file in blocks of CHUNK_SIZE points.
+
+    Uncompressed files are memory mapped and viewed in place, as their records are
+    fixed-size structs on disk. Compressed files are decoded chunk by chunk.
+
+    :param infile: laspy reader opened on filepath
+    :param filepath: path of the LAS/LAZ file
+    '''
+    header = infile.header
+    point_format = header.point_format
+    dtype = point_format.dtype()
+    if header.are_points_compressed or dtype.itemsize != point_format.size:
+        yield from infile.chunk_iterator(CHUNK_SIZE)
+        return
+
+    records = np.memmap(filepath, dtype=dtype, mode='r',
+                        offset=header.offset_to_point_data, shape=(header.point_count,))
+    for start in range(0, header.point_count, CHUNK_SIZE):
+        yield laspy.PackedPointRecord(records[start:start + CHUNK_SIZE], point_format)
+
+
+def _present_attributes(point_format):
+    '''
+    Returns the entries of ATTRIBUTE_LIST provided by a LAS point format.
+
+    :param point_format: LazPy point format object
+    '''
+    # Raw dtype names are included so composed fields such as classification_flags are found
+    dimensions = set(point_format.dimension_names) | set(point_format.dtype().names)
+    return [attr for attr in ATTRIBUTE_LIST if attr in dimensions]
+
+
+def _check_attribute_range(point_format, attr, dtype):
+    '''
+    Raises a ValueError if the LAS values of an attribute may not fit in the buffer dtype.
+    Assigning into the buffer casts unsafely, so a wrong ATTRIBUTE_TYPES entry would
+    otherwise silently wrap values.
+
+    :param point_format: LazPy point format object
+    :param attr: name of the attribute, as found by _present_attributes
+    :param dtype: dtype of the buffer the attribute is decoded into
+    '''
+    if not np.issubdtype(dtype, np.integer):
+        return
+    try:
+        dimension = point_format.dimension_by_name(attr)
+        value_min, value_max = dimension.min, dimension.max
+    except ValueError:
+        # Composed fields such as classification_flags only exist in the raw record dtype
+        info = np.iinfo(point_format.dtype()[attr])
+        value_min, value_max = info.min, info.max
+    info = np.iinfo(dtype)
+    if value_min < info.min or value_max > info.max:
+        raise ValueError(f"LAS attribute '{attr}' ranges from {value_min} to {value_max}, "
+                         f"which does not fit in {np.dtype(dtype).name}")
+
+
+def _allocate_buffers(num_points, attribute_names):
+    '''
+    Allocates a set of decoding buffers: float32 coordinates, and one buffer per attribute
+    in the native dtype of its Blender attribute, so foreach_set can consume them as they are.
+
+    :param num_points: number of points the buffers can hold
+    :param attribute_names: names of the attributes to allocate a buffer for
+    :return: (points, attributes) tuple
+    '''
+    points = np.empty((num_points, 3), dtype=np.float32)
+    attributes = {
+        attr: np.empty(num_points, dtype=BLENDER_DTYPES[ATTRIBUTE_TYPES.get(attr, 'INT')])
+        for attr in attribute_names
+    }
+    return points, attributes
+
+
+class _BufferPool:
+    '''
+    Thread safe pool of decoding buffer sets from _allocate_buffers, all sized for the
+    largest file of an import. Sets are only allocated when no released one is available,
+    up to max_sets, so a single file import allocates a single set.
+    '''
+
+    def __init__(self, max_sets, num_points, attribute_names):
+        self._max_sets = max_sets
+        self._num_points = num_points
+        self._attribute_names = attribute_names
+        self._allocated = 0
+        self._free = []
+        self._condition = threading.Condition()
+
+    def get(self):
+        with self._condition:
+            while not self._free and self._allocated >= self._max_sets:
+                self._condition.wait()
+            if self._free:
+                return self._free.pop()
+            self._allocated += 1
+        return _allocate_buffers(self._num_points, self._attribute_names)
+
+    def put(self, buffers):
+        with self._condition:
+            self._free.append(buffers)
+            self._condition.notify()
+
+
+def _decode_file(filepath, import_attributes, pool):
+    '''
+    Reads and decodes a LAS/LAZ file. Does not touch Blender data, so it is safe
+    to run from a worker thread.
+
+    :param filepath: path of the LAS/LAZ file to read
+    :param import_attributes: whether to also read the additional LiDAR attributes
+    :param pool: _BufferPool whose buffer sets are large enough for this file.
+        The buffer set used is returned and must be put back once its data is consumed.
+    :return: (buffers, (points, attributes, header, location)) tuple
+    '''
+    buffers = pool.get()
+    try:
+        with laspy.open(filepath) as infile:
+            # Header fields are properties, read them once
+            header = infile.header
+            x_scale, y_scale, z_scale = header.x_scale, header.y_scale, header.z_scale
+            x_offset, y_offset, z_offset = header.x_offset, header.y_offset, header.z_offset
+
+            # Get LAS points
+            num_points = header.point_count
+
+            # Points are streamed chunk by chunk so only one decoded chunk lives in memory at a time.
+            # Raw integer coordinates are scaled straight into the pooled float32 buffer,
+            # which matches Blender's vertex storage, so no cast is needed later on.
+            points = buffers[0][:num_points]
+            scales = np.array((x_scale, y_scale, z_scale), dtype=np.float32)
+            # Points are stored relative to the center of the file's bounds, which becomes the
+            # object's location. This keeps float32 coordinates small and the origin centered.
+            # The bounds are checked against the first chunk, before any point is scaled.
+            raw_bounds = _raw_bounds(header)
+            biases = None
+
+            # Find once which attributes the point format provides, instead of probing every chunk
+            present_attributes = _present_attributes(header.point_format) if import_attributes else []
+            attributes = {attr: buffers[1][attr][:num_points] for attr in present_attributes}
+            for attr, values in attributes.items():
+                _check_attribute_range(header.point_format, attr, values.dtype)
+
+            start = 0
+            for chunk in _iter_point_chunks(infile, filepath):
+                end = start + len(chunk)
+                raws = (chunk.X, chunk.Y, chunk.Z)
+                if biases is None:
+                    biases = _raw_biases(raw_bounds, raws)
+                for i, raw in enumerate(raws):
+                    _scale_into(raw, biases[i], scales[i], points[start:end, i])
+
+                for attr in present_attributes:
+                    attributes[attr][start:end] = getattr(chunk, attr)
+                start = end
+
+            if biases is None:
+                # No point to decode
+                biases = np.zeros(3, dtype=np.int64)
+            location = biases * np.array((x_scale, y_scale, z_scale)) + np.array((x_offset, y_offset, z_offset))
+    except BaseException:
+        pool.put(buffers)
+        raise
+
+    return buffers, (points, attributes, header, location)
+
+
 class IMPORT_OT_las_data(Operator, ImportHelper): # type: ignore
     bl_idname = "import_scene.las_data"
     bl_label = "Import LAS/LAZ data"
@@ -65,74 +341,157 @@ class IMPORT_OT_las_data(Operator, ImportHelper): # type: ignore
         default=True,
     )
 
+    header_only: BoolProperty(
+        name="Header Only",
+        description="Only import the LAS header attributes on empty objects, without reading any point",
+        default=False,
+    )
+
     def execute(self, context):
         object_list = []
-        for file in self.files:
-            start = time.time()
-            print(f"Importing {file.name}...")  
-            filepath = path.join(self.directory, file.name)
-            # Read LAS/LAZ file
+        start = time.time()
+        filepaths = [path.join(self.directory, file.name) for file in self.files]
+        if self.header_only:
+            object_list = [self.import_header(context, filepath) for filepath in filepaths]
+            if self.center_in_scene:
+                self.finalize_centering(object_list)
+            return {'FINISHED'}
+
+        # Read headers first, so buffers sized for the largest file
+        # can be reused across files instead of allocating new ones for each of them
+        point_counts = []
+        attribute_names = set()
+        for filepath in filepaths:
             with laspy.open(filepath) as infile:
-                # Get LAS points
-                print(infile.header.x_min * infile.header.x_scale + infile.header.x_offset)
-                print(infile.header.y_min * infile.header.y_scale + infile.header.y_offset)
-                print(infile.header.z_min * infile.header.z_scale + infile.header.z_offset)
-                num_points_to_read = infile.header.point_count
-                all_points = infile.read_points(n=num_points_to_read)
-
-                x_coords = np.array(all_points.x) * infile.header.x_scale + infile.header.x_offset
-                y_coords = np.array(all_points.y) * infile.header.y_scale + infile.header.y_offset
-                z_coords = np.array(all_points.z) * infile.header.z_scale + infile.header.z_offset
-                points = np.column_stack((x_coords, y_coords, z_coords))
-
-                attributes = {}
+                point_counts.append(infile.header.point_count)
                 if self.import_attributes:
-                    for attr in ATTRIBUTE_LIST:
-                        if hasattr(all_points, attr):
-                            attributes[attr] = np.array(getattr(all_points, attr))
-
-            # Import LAS points as a mesh
-            # As Blender python API does not support point cloud creation from script yet,
-            # we first create a mesh object and then convert it to point cloud if needed.
-            mesh_obj = self.import_points_as_mesh(context, points)
-
-            if self.import_attributes:
-                for attr_name, attr_values in attributes.items():
-                    attribute = mesh_obj.data.attributes.new(name=attr_name, type="INT", domain="POINT") #TODO: attribute type based on actual data type
-                    attribute.data.foreach_set("value", attr_values)
-
-            if not self.import_as_mesh:
-                # Convert mesh to point cloud
-                with context.temp_override(object=mesh_obj,
-                                               active_object=mesh_obj,
-                                               selected_objects=[mesh_obj],
-                                               selected_editable_objects=[mesh_obj],
-                                               mode='OBJECT'): # type: ignore
-                    bpy.ops.object.convert(target='POINTCLOUD')
-
-            self.store_header_attributes(infile.header, mesh_obj)
-
-            object_list.append(mesh_obj)
-            end = time.time()
-            print(f"Imported {file.name} in {end - start:.2f} seconds.")
+                    attribute_names.update(_present_attributes(infile.header.point_format))
+
+        # Reading and decompressing files is independent per file and releases the GIL,
+        # so it runs in worker threads. Blender data is only touched from the main thread.
+        # Each running worker holds at most one buffer set from the pool.
+        max_workers = max(1, min(len(filepaths), os.cpu_count() or 1))
+        pool = _BufferPool(max_workers, max(point_counts, default=0), attribute_names)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(_decode_file, filepath, self.import_attributes, pool): bpy.path.basename(filepath)
+                for filepath in filepaths
+            }
+
+            try:
+                for future in as_completed(futures):
+                    name = futures.pop(future)
+                    buffers, decoded = future.result()
+                    try:
+                        mesh_obj = self._build_object(context, decoded, name)
+                    finally:
+                        # The data now lives in Blender, hand the buffers over to the next file
+                        pool.put(buffers)
+                    if not self.import_as_mesh:
+                        self.convert_to_pointcloud(context, mesh_obj)
+
+                    object_list.append(mesh_obj)
+                    if DEBUG:
+                        end = time.time()
+                        # Files are decoded in parallel, so report the time elapsed since the import started
+                        print(f"Imported {name} after {end - start:.2f} seconds.")
+            except BaseException:
+                # Stop decoding the remaining files. Decodes already running may wait for
+                # buffers held by finished results that will never be consumed, so release them.
+                executor.shutdown(wait=False, cancel_futures=True)
+                for future in futures:
+                    if future.done() and not future.cancelled() and future.exception() is None:
+                        pool.put(future.result()[0])
+                raise
 
         if self.center_in_scene:
             self.finalize_centering(object_list)
 
         return {'FINISHED'}
 
-    def import_points_as_mesh(self, context, points) -> bpy.types.Object:
+    def import_header(self, context, filepath) -> bpy.types.Object:
+        '''
+        Creates an empty object holding only the header attributes of a LAS/LAZ file.
+
+        :param self: the IMPORT_OT_las_data instance
+        :param context: Blender context
+        :param filepath: path of the LAS/LAZ file to read the header from
+        '''
+        with laspy.open(filepath) as infile:
+            header = infile.header
+
+        name = bpy.path.basename(filepath)
+        mesh_obj = bpy.data.objects.new(name, bpy.data.meshes.new(name))
+        context.collection.objects.link(mesh_obj)
+        # Points are not read here, so unusable bounds fall back to the header offsets
+        raw_bounds = _raw_bounds(header)
+        biases = _raw_center(raw_bounds) if raw_bounds is not None else np.zeros(3, dtype=np.int64)
+        location = biases * header.scales + header.offsets
+        mesh_obj.location = Vector(location)
+        # Object locations are float32, keep the exact origin for finalize_centering
+        mesh_obj['laz_origin'] = location.tolist()
+        self.store_header_attributes(header, mesh_obj)
+        return mesh_obj
+
+    def _build_object(self, context, decoded, name) -> bpy.types.Object:
+        '''
+        Creates the Blender object for a decoded file. Must run on the main thread.
+
+        :param self: the IMPORT_OT_las_data instance
+        :param context: Blender context
+        :param decoded: (points, attributes, header, location) tuple returned by _decode_file
+        :param name: name given to the new object and its data
+        '''
+        points, attributes, header, location = decoded
+
+        # Import LAS points as a mesh
+        # As Blender python API does not support point cloud creation from script yet,
+        # we first create a mesh object and the caller converts it to point cloud if needed.
+        mesh_obj = self.import_points_as_mesh(context, points, name)
+        mesh_obj.location = Vector(location)
+        # Object locations are float32, keep the exact origin for finalize_centering
+        mesh_obj['laz_origin'] = location.tolist()
+
+        # attributes is empty when attributes are not imported
+        for attr_name, attr_values in attributes.items():
+            attr_type = ATTRIBUTE_TYPES.get(attr_name, 'INT')
+            attribute = mesh_obj.data.attributes.new(name=attr_name, type=attr_type, domain="POINT")
+            attribute.data.foreach_set("value", attr_values)
+
+        self.store_header_attributes(header, mesh_obj)
+        return mesh_obj
+
+    def convert_to_pointcloud(self, context, mesh_obj):
+        '''
+        Converts an imported mesh object to a point cloud object, in place.
+
+        :param self: the IMPORT_OT_las_data instance
+        :param context: Blender context
+        :param mesh_obj: mesh object created by _build_object
+        '''
+        with context.temp_override(object=mesh_obj,
+                                       active_object=mesh_obj,
+                                       selected_objects=[mesh_obj],
+                                       selected_editable_objects=[mesh_obj],
+                                       mode='OBJECT'): # type: ignore
+            bpy.ops.object.convert(target='POINTCLOUD')
+
+    def import_points_as_mesh(self, context, points, name) -> bpy.types.Object:
         # Create a new mesh object
-        mesh = bpy.data.meshes.new(bpy.path.basename(self.filepath))
-        obj = bpy.data.objects.new(bpy.path.basename(self.filepath), mesh)
+        mesh = bpy.data.meshes.new(name)
+        obj = bpy.data.objects.new(name, mesh)
 
         # Link the mesh to the scene
         context.collection.objects.link(obj)
     
-        # Create mesh vertices from points
-        mesh.from_pydata(points, [], [])
-        # Update mesh
-        mesh.update()
+        # Create mesh vertices from points, using the buffer protocol rather than from_pydata
+        mesh.vertices.add(len(points))
+        mesh.vertices.foreach_set("co", np.ascontiguousarray(points, dtype=np.float32).ravel())
+        # Update mesh. The point cloud conversion rebuilds its own data,
+        # so this is only needed when keeping the mesh.
+        if self.import_as_mesh:
+            mesh.update()
         return obj
 
     def store_header_attributes(self, header, object):
@@ -172,53 +531,27 @@ class IMPORT_OT_las_data(Operator, ImportHelper): # type: ignore
         :param imported_objects: list of blender objects created during import
         '''
         #We look for min and max in imported objects
-        minxs = []
-        minys = []
-        minzs = []
-        maxxs = []
-        maxys = []
-        maxzs = []
-        for obj in imported_objects:
-            x_min = obj['x_min']* obj['x_scale'] + obj['x_offset']
-            y_min = obj['y_min']* obj['y_scale'] + obj['y_offset']
-            z_min = obj['z_min']* obj['z_scale'] + obj['z_offset']
-            x_max = obj['x_max']* obj['x_scale'] + obj['x_offset']
-            y_max = obj['y_max']* obj['y_scale'] + obj['y_offset']
-            z_max = obj['z_max']* obj['z_scale'] + obj['z_offset']
-
-            obj['pos_min'] = Vector((x_min, y_min, z_min))
-            obj['pos_max'] = Vector((x_max, y_max, z_max))
-
-            minxs.append(x_min)
-            minys.append(y_min)
-            minzs.append(z_min)
-            maxxs.append(x_max)
-            maxys.append(y_max)
-            maxzs.append(z_max)
+        # Header bounds are already stored in real world coordinates
+        bounds = np.empty((len(imported_objects), 6), dtype=np.float64)
+        for i, obj in enumerate(imported_objects):
+            bounds[i] = (obj['x_min'], obj['y_min'], obj['z_min'],
+                         obj['x_max'], obj['y_max'], obj['z_max'])
+            obj['pos_min'] = bounds[i, :3].tolist()
+            obj['pos_max'] = bounds[i, 3:].tolist()
 
         if not bpy.context.scene.get('laz_center'):
-            minp = Vector((min(minxs), min(minys), min(minzs)))
-            maxp = Vector((max(maxxs), max(maxys), max(maxzs)))
-            center = (minp + maxp) / 2.0
+            center = (bounds[:, :3].min(axis=0) + bounds[:, 3:].max(axis=0)) / 2.0
             if not self.center_vertically:
-                center = Vector((center.x, center.y, 0))
+                center[2] = 0.0
 
-            bpy.context.scene['laz_center'] = center
-        
-        center = Vector(bpy.context.scene['laz_center'])
+            bpy.context.scene['laz_center'] = center.tolist()
+
+        # Subtract in float64, before the result is stored in the float32 object location,
+        # so adjacent tiles stay aligned even with large projected coordinates
+        center = np.array(bpy.context.scene['laz_center'], dtype=np.float64)
         for obj in imported_objects:
-            obj.location -= center
-            #we also need to update the object's orginin location
-            with bpy.context.temp_override(object=obj,
-                                           active_object=obj,
-                                           selected_objects=[obj],
-                                           selected_editable_objects=[obj],
-                                           mode='OBJECT') as ctx: # type: ignore
-                new_origin = (Vector(obj['pos_min']) + Vector(obj['pos_max'])) / 2.0 - center
-                bpy.context.scene.cursor.location = new_origin
-                bpy.ops.object.origin_set(type='ORIGIN_CURSOR')
-                
-                
+            obj.location = Vector(np.array(obj['laz_origin'], dtype=np.float64) - center)
+
 
 def menu_func_import(self, context):
     self.layout.operator(IMPORT_OT_las_data.bl_idname, text="LAS/LAZ data (.las, .laz)")